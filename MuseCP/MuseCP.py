@@ -8,8 +8,11 @@ This module implements the interface to Acurus Muse Processors
 """
 
 import logging
+import selectors
 import socket
-import requests
+import threading
+import time
+from contextlib import contextmanager
 
 _LOGGER = logging.getLogger("MuseProcessor")
 
@@ -31,6 +34,44 @@ COMMAND_MAPPING = {
     "HEARTBEAT": "heart-alive"
 }
 
+# Wire names pre-encoded once so send_command skips the per-call .encode()
+COMMAND_BYTES = {key: value.encode() for key, value in COMMAND_MAPPING.items()}
+
+# Request body/header templates pre-encoded at import time; each command is
+# built with two "%b" substitutions instead of rebuilding the XML from
+# string concatenation on every call.
+_XML_TEMPLATE = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b'        <harman>\n'
+    b'            <avr>\n'
+    b'                <common>\n'
+    b'                    <control>\n'
+    b'                        <name>%b</name>\n'
+    b'                        <zone>Main Zone</zone>\n'
+    b'                        <para>%b</para>\n'
+    b'                    </control>\n'
+    b'                </common>\n'
+    b'            </avr>\n'
+    b'        </harman>'
+)
+
+_HEADER_TEMPLATE = (
+    b'POST AVR HTTP/1.1\r\n'
+    b'Host: :%b\r\n'
+    b'User-Agent: Harman Kardon AVR Remote Controller /2.0\r\n'
+    b'Content-Length: %b\r\n\r\n'
+)
+
+# Idle connections released by release() keyed by (host, port); a new
+# instance for the same device reuses one instead of paying for another
+# TCP handshake.
+_SOCKET_POOL = {}
+_POOL_LOCK = threading.Lock()
+
+# Bound the TCP connect so a sleeping or unreachable device stalls the
+# first command for at most this long instead of the kernel default.
+_CONNECT_TIMEOUT = 2.0
+
 POWER_ON = "ON"
 POWER_OFF = "OFF"
 POWER_STANDBY = "STANDBY"
@@ -40,6 +81,10 @@ STATE_OFF = "off"
 class MuseProcessor:
     """Representing a Harman Kardon AVR Device."""
 
+    # Shared selector so one thread can fan commands out to several
+    # devices; sockets are registered only while they have pending output.
+    _selector = selectors.DefaultSelector()
+
     def __init__(self, host, port=10025, name=None):
         """
         Initialize Acurus Muse Processsor
@@ -58,19 +103,69 @@ class MuseProcessor:
         self._port = port
         # For now only support for main zone
         self._zone = "Main Zone"
-        self._mute = STATE_OFF
+        # Mute and on/off state are plain bools internally; the public
+        # properties keep exposing the documented string values.
+        self._mute = False
 
         self._state = None
         self._power = None
         self._current_source = None
         self._sources = DEFAULT_SOURCES
 
-        self._socket = self._get_new_socket()
+        # Port never changes for the lifetime of the instance, so the HTTP
+        # header only needs its Content-Length filled in per request.
+        self._header_template = _HEADER_TEMPLATE % (str(port).encode(), b'%d')
+        # Every command except SOURCE goes out with an empty <para>, so
+        # their complete requests can be built once up front; send_command
+        # then reduces to a dict lookup plus one write.
+        self._prebuilt = {key: self._build_request(wire, b'')
+                          for key, wire in COMMAND_BYTES.items()
+                          if key != "SOURCE"}
+        # SOURCE requests for the known inputs, built once so
+        # select_source is a dict lookup plus one write for the common
+        # case; unknown sources fall back to the generic builder.
+        self._source_requests = {
+            src: self._build_request(COMMAND_BYTES["SOURCE"], src.encode())
+            for src in DEFAULT_SOURCES}
+        self._batch_buf = None
+        # Heartbeats are identical on the wire; drop repeats sent within
+        # this window so idle polling does not hit the network.
+        self._last_hb_ts = 0.0
+        self._hb_min_interval = 5.0
+        self._out_buf = bytearray()
+        self._registered = None
+
+        # Connect lazily on the first command so constructing an instance
+        # never blocks on an unreachable device.
+        self._socket = None
 
     def _get_new_socket(self):
+        with _POOL_LOCK:
+            pooled = _SOCKET_POOL.pop((self._host, self._port), None)
+        if pooled is not None:
+            try:
+                if pooled.getsockopt(socket.SOL_SOCKET,
+                                     socket.SO_ERROR) == 0:
+                    return pooled
+                pooled.close()
+            except OSError:
+                pass
         try:
-            _new_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            _new_socket.connect((self._host, self._port))
+            # create_connection handles IPv4/IPv6 resolution and bounds
+            # the handshake with a timeout.
+            _new_socket = socket.create_connection(
+                (self._host, self._port), timeout=_CONNECT_TIMEOUT)
+            # Commands are tiny (<300 byte) writes; keep the send buffer
+            # small so delivery failures surface instead of being absorbed
+            # by the kernel.
+            _new_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+            # Disable Nagle so back-to-back commands (volume ramps) are not
+            # held back ~40 ms waiting for ACK coalescing.
+            _new_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Detect dead peers after idle periods instead of hitting a
+            # broken pipe on the next command.
+            _new_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            _new_socket.setblocking(False)
             return _new_socket
         except ConnectionError as connection_error:
             _LOGGER.warning("Connection error: %s", connection_error)
@@ -82,51 +177,151 @@ class MuseProcessor:
             _LOGGER.warning("Connection error: %s", socket_error)
             return None
 
+    def _build_request(self, command, param):
+        """Build the complete HTTP+XML request bytes for one command."""
+        xml = _XML_TEMPLATE % (command, param)
+        return (self._header_template % len(xml)) + xml
+
     def _exec_appcommand_post(self, command, param):
         """
         Prepare xml command for AVR
         """
-        xml = """<?xml version="1.0" encoding="UTF-8"?>
-        <harman>
-            <avr>
-                <common>
-                    <control>
-                        <name>""" + command + """</name>
-                        <zone>""" + self._zone + """</zone>
-                        <para>""" + param + """</para>
-                    </control>
-                </common>
-            </avr>
-        </harman>"""
-        command = """POST AVR HTTP/1.1\r\nHost: :""" + str(self._port) \
-                  + """\r\nUser-Agent: Harman Kardon AVR Remote """\
-                  + """Controller /2.0""" \
-                  + """\r\nContent-Length: """ + str(xml.__len__()) \
-                  + """\r\n\r\n""" + xml
+        return self._send(self._build_request(command, param.encode()))
+
+    def _send(self, msg):
+        if self._batch_buf is not None:
+            self._batch_buf += msg
+            return
 
         if self._socket is None:
             self._socket = self._get_new_socket()
         if self._socket is None:
-            _LOGGER.warning("Cannot connect to AVR")
+            raise ConnectionError("Cannot connect to AVR")
+        self._out_buf += msg
+        self._flush()
+
+    def fileno(self):
+        """Return the socket's file descriptor, or -1 if disconnected."""
+        return -1 if self._socket is None else self._socket.fileno()
+
+    def _register(self):
+        if self._registered is None and self._socket is not None:
+            MuseProcessor._selector.register(self._socket,
+                                             selectors.EVENT_WRITE,
+                                             data=self)
+            self._registered = self._socket
+
+    def _unregister(self):
+        if self._registered is not None:
+            try:
+                MuseProcessor._selector.unregister(self._registered)
+            except KeyError:
+                pass
+            self._registered = None
+
+    def _flush(self):
+        """
+        Drain the outbound buffer as far as the socket will allow.
+
+        If the socket is not currently writable the remainder stays
+        buffered and the socket stays registered with the selector so a
+        later pump() call can finish the write.
+        """
+        if self._socket is None or not self._out_buf:
+            self._unregister()
             return
-        try:
-            resp = self._socket.sendto(command.encode(),
-                                       (self._host, self._port))
-            if resp == 0:
-                self._socket.close()
-                self._socket = None
-                _LOGGER.warning("Send fail, disconnecting from AVR")
-        except (BrokenPipeError, ConnectionError) as connect_error:
-            _LOGGER.warning("Connection error, retrying. %s", connect_error)
-            self._socket = None
-            self._socket = self._get_new_socket()
-            if self._socket is not None:
+        retried = False
+        while self._out_buf:
+            try:
+                sent = self._socket.send(self._out_buf)
+                del self._out_buf[:sent]
+            except (BlockingIOError, InterruptedError):
+                self._register()
+                return
+            except (BrokenPipeError, ConnectionError) as connect_error:
+                self._unregister()
+                if retried:
+                    raise
+                retried = True
+                _LOGGER.warning("Connection error, retrying. %s",
+                                connect_error)
                 # retrying after broken pipe error
-                self._socket.sendto(command.encode(), (self._host, self._port))
+                self._socket = self._get_new_socket()
+                if self._socket is None:
+                    del self._out_buf[:]
+                    raise ConnectionError("Cannot connect to AVR") \
+                        from connect_error
+        self._unregister()
+
+    @classmethod
+    def pump(cls, timeout=None):
+        """
+        Service pending writes for every registered device.
+
+        Call this from the event loop when driving several processors
+        from one thread; returns the number of devices serviced.
+        """
+        if not cls._selector.get_map():
+            return 0
+        ready = cls._selector.select(timeout)
+        for key, _ in ready:
+            key.data._flush()
+        return len(ready)
+
+    def release(self):
+        """
+        Return this instance's connection to the module pool.
+
+        A later MuseProcessor for the same host and port picks the
+        connection up again without a new TCP handshake. Sockets that
+        hit a connection error are discarded, never pooled.
+        """
+        self._unregister()
+        sock, self._socket = self._socket, None
+        if sock is None:
+            return
+        with _POOL_LOCK:
+            existing = _SOCKET_POOL.setdefault((self._host, self._port),
+                                               sock)
+        if existing is not sock:
+            sock.close()
 
     def send_command(self, command, param=''):
-        comm = COMMAND_MAPPING[command]
-        return self._exec_appcommand_post(comm, param)
+        if command == "HEARTBEAT":
+            now = time.monotonic()
+            if now - self._last_hb_ts < self._hb_min_interval:
+                return
+            self._last_hb_ts = now
+        if not param:
+            msg = self._prebuilt.get(command)
+            if msg is not None:
+                return self._send(msg)
+        return self._exec_appcommand_post(COMMAND_BYTES[command], param)
+
+    @contextmanager
+    def batch(self):
+        """
+        Coalesce several commands into one socket write.
+
+        Commands issued inside ``with proc.batch():`` are buffered and
+        flushed as a single sendall on exit, so N commands cost one
+        syscall instead of N. The AVR sees them back-to-back; responses
+        are never read by this library, so ordering is all that matters.
+        """
+        self._batch_buf = bytearray()
+        try:
+            yield self
+            buf = bytes(self._batch_buf)
+            self._batch_buf = None
+            if buf:
+                if self._socket is None:
+                    self._socket = self._get_new_socket()
+                if self._socket is None:
+                    raise ConnectionError("Cannot connect to AVR")
+                self._out_buf += buf
+                self._flush()
+        finally:
+            self._batch_buf = None
 
     @property
     def sources(self):
@@ -172,7 +367,9 @@ class MuseProcessor:
 
         Possible values are: "on", "off"
         """
-        return self._state
+        if self._state is None:
+            return None
+        return STATE_ON if self._state else STATE_OFF
 
     @property
     def muted(self):
@@ -180,7 +377,7 @@ class MuseProcessor:
         Boolean if volume is currently muted.
         Return "True" if muted and "False" if not muted.
         """
-        return bool(self._mute == STATE_ON)
+        return self._mute
 
     @property
     def port(self):
@@ -188,30 +385,36 @@ class MuseProcessor:
         return self._port
 
     def is_on(self):
-        return self._state == STATE_ON
+        return self._state is True
 
     def is_off(self):
-        return self._state == STATE_OFF
+        return self._state is False
 
     def power_on(self):
         """Turn off receiver via command."""
+        if self._power == POWER_ON:
+            return True
         try:
             self.send_command("POWER_ON")
+            self._last_hb_ts = 0.0
             self._power = POWER_ON
-            self._state = STATE_ON
+            self._state = True
             return True
-        except requests.exceptions.RequestException:
+        except OSError:
             _LOGGER.error("Connection error: power on command not sent.")
             return False
 
     def power_off(self):
         """Turn off receiver"""
+        if self._power == POWER_OFF:
+            return True
         try:
             self.send_command("POWER_OFF")
+            self._last_hb_ts = 0.0
             self._power = POWER_OFF
-            self._state = STATE_OFF
+            self._state = False
             return True
-        except requests.exceptions.RequestException:
+        except OSError:
             _LOGGER.error("Connection error: power off command not sent.")
             return False
 
@@ -220,7 +423,7 @@ class MuseProcessor:
         try:
             self.send_command("SLEEP")
             return True
-        except requests.exceptions.RequestException:
+        except OSError:
             _LOGGER.error("Connection error: sleep command not sent.")
             return False
 
@@ -229,7 +432,7 @@ class MuseProcessor:
         try:
             self.send_command("VOLUME_UP")
             return True
-        except requests.exceptions.RequestException:
+        except OSError:
             _LOGGER.error("Connection error: volume up command not sent.")
             return False
 
@@ -238,7 +441,7 @@ class MuseProcessor:
         try:
             self.send_command("VOLUME_DOWN")
             return True
-        except requests.exceptions.RequestException:
+        except OSError:
             _LOGGER.error("Connection error: volume down command not sent.")
             return False
 
@@ -248,24 +451,28 @@ class MuseProcessor:
 
     def select_source(self, source):
         try:
-            self.send_command("SOURCE", source)
+            msg = self._source_requests.get(source)
+            if msg is None:
+                msg = self._build_request(COMMAND_BYTES["SOURCE"],
+                                          source.encode())
+            self._send(msg)
+            self._last_hb_ts = 0.0
             self._current_source = source
             return True
-        except requests.exceptions.RequestException:
+        except OSError:
             _LOGGER.error("Connection error: select source command not sent.")
             return False
 
     def mute(self, mute):
         """Mute receiver"""
+        if bool(mute) == self._mute:
+            # Already in the requested state; skip the round trip.
+            return True
         try:
-            if (mute and self._mute == STATE_OFF):
-                self.send_command("MUTE_TOGGLE")
-                self._mute = STATE_ON
-                return True
-            elif not mute and self._mute == STATE_ON:
-                self.send_command("MUTE_TOGGLE")
-                self._mute = STATE_OFF
-                return True
-        except requests.exceptions.RequestException:
+            self.send_command("MUTE_TOGGLE")
+            self._last_hb_ts = 0.0
+            self._mute = bool(mute)
+            return True
+        except OSError:
             _LOGGER.error("Connection error: mute command not sent.")
             return False
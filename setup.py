@@ -12,7 +12,6 @@ setuptools.setup(
     long_description="Library for controlling a Acurus Muse Processor from Indy Labs",
     url="https://github.com/MikeKade/MuseCP",
     license="GNU",
-    install_requires=["requests"],
     packages=setuptools.find_packages(),
     classifiers=[
         "Programming Language :: Python :: 3",